@@ -1,7 +1,47 @@
+import ctypes
+import ctypes.util
+import errno
+import fcntl
 import os
+import re
+import shlex
 import shutil
 import subprocess
+import sys
 import hashlib
+import mmap
+import ssl
+import stat
+import struct
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+
+try:
+    _renameat2 = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True).renameat2
+    _renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    _renameat2.restype = ctypes.c_int
+except (OSError, AttributeError):
+    _renameat2 = None
+
+# A UTF-8 lead byte followed by a continuation byte, as seen after latin1 decoding
+MOJIBAKE_RE = re.compile("[\xc2-\xf4][\x80-\xbf]")
+
+FS_IOC_FIEMAP = 0xC020660B
+FIEMAP_FLAG_SYNC = 0x1
+FIEMAP_EXTENT_LAST = 0x1
+FIEMAP_EXTENT_SHARED = 0x2000
+# UNKNOWN | DELALLOC | ENCODED | DATA_ENCRYPTED | NOT_ALIGNED | DATA_INLINE | DATA_TAIL | UNWRITTEN
+FIEMAP_EXTENT_UNRELIABLE = 0x2 | 0x4 | 0x8 | 0x80 | 0x100 | 0x200 | 0x400 | 0x800
+FIEMAP_HEADER = struct.Struct("=QQIIII")
+FIEMAP_EXTENT = struct.Struct("=QQQQQIIII")
 
 
 def safe_path(p):
@@ -16,13 +56,30 @@ def parse_env_bool(var_name, default=True):
     return val in ("1", "true", "yes")
 
 
-def run_list_command(cmd_template, old_path, new_path):
-    if not cmd_template.strip():
+def rename_noreplace(old_path, new_path):
+    if _renameat2 is not None:
+        if _renameat2(AT_FDCWD, os.fsencode(old_path), AT_FDCWD, os.fsencode(new_path), RENAME_NOREPLACE) == 0:
+            return True
+        err = ctypes.get_errno()
+        if err == errno.EEXIST:
+            return False
+        if err not in (errno.EINVAL, errno.ENOSYS):
+            raise OSError(err, os.strerror(err), old_path, None, new_path)
+
+    # Kernel or filesystem without RENAME_NOREPLACE support
+    if os.path.exists(new_path):
+        return False
+    os.rename(old_path, new_path)
+    return True
+
+
+def run_list_command(cmd_argv, old_path, new_path):
+    if not cmd_argv:
         return
     try:
-        full_cmd = f"{cmd_template} '{old_path}' '{new_path}'"
-        print(f"📁 Listing both paths: {full_cmd}")
-        subprocess.run(full_cmd, shell=True)
+        full_cmd = [*cmd_argv, old_path, new_path]
+        print(f"📁 Listing both paths: {shlex.join(full_cmd)}")
+        subprocess.run(full_cmd, check=False)
     except Exception as e:
         print(f"⚠️ Failed to run list command: {e}")
 
@@ -51,161 +108,369 @@ def move_dir_contents(src_dir, dst_dir):
             print(f"❌ Failed to move {safe_path(src)} → {safe_path(dst)}: {e}")
 
 
-def hash_file(filepath, block_size=65536):
-    hasher = hashlib.sha256()
+def new_hasher():
+    if blake3 is not None:
+        return blake3(max_threads=blake3.AUTO)
+    return hashlib.sha256()
+
+
+def hash_file(filepath):
+    hasher = new_hasher()
     with open(filepath, 'rb') as f:
-        for chunk in iter(lambda: f.read(block_size), b''):
-            hasher.update(chunk)
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hasher.update(mm)
     digest = hasher.hexdigest()
     print(f"🔑 Hashed {safe_path(filepath)} → {digest}")
     return digest
 
 
-def dirs_are_identical(dir1, dir2):
-    files1 = sorted(os.listdir(dir1))
-    files2 = sorted(os.listdir(dir2))
+def file_extents(fd, max_extents=64):
+    buf = bytearray(FIEMAP_HEADER.size + FIEMAP_EXTENT.size * max_extents)
+    FIEMAP_HEADER.pack_into(buf, 0, 0, 0xFFFFFFFFFFFFFFFF, FIEMAP_FLAG_SYNC, 0, max_extents, 0)
+    fcntl.ioctl(fd, FS_IOC_FIEMAP, buf)
+    mapped = FIEMAP_HEADER.unpack_from(buf, 0)[3]
 
-    if files1 != files2:
+    extents = []
+    for i in range(mapped):
+        logical, physical, length, _, _, flags, _, _, _ = FIEMAP_EXTENT.unpack_from(
+            buf, FIEMAP_HEADER.size + i * FIEMAP_EXTENT.size)
+        extents.append((logical, physical, length, flags))
+    return extents
+
+
+def files_share_extents(path1, path2):
+    # Reflinked copies (Btrfs/XFS) map to the same physical extents, which proves
+    # identical content without reading any data. Anything inconclusive returns False.
+    try:
+        with open(path1, 'rb') as f1, open(path2, 'rb') as f2:
+            extents1 = file_extents(f1.fileno())
+            extents2 = file_extents(f2.fileno())
+    except OSError:
         return False
 
-    for name in files1:
-        path1 = os.path.join(dir1, name)
-        path2 = os.path.join(dir2, name)
+    if not extents1 or extents1 != extents2 or not extents1[-1][3] & FIEMAP_EXTENT_LAST:
+        return False
+    return all(flags & FIEMAP_EXTENT_SHARED and not flags & FIEMAP_EXTENT_UNRELIABLE
+               for _, _, _, flags in extents1)
 
-        if os.path.isdir(path1) or os.path.isdir(path2):
-            return False  # Nested dir comparison not implemented
 
-        try:
-            if hash_file(path1) != hash_file(path2):
-                return False
-        except Exception as e:
-            print(f"⚠️ Failed to hash {safe_path(path1)} or {safe_path(path2)}: {e}")
+def files_are_identical(path1, path2, block_size=1 << 20):
+    st1 = os.stat(path1)
+    st2 = os.stat(path2)
+    if st1.st_size != st2.st_size:
+        return False
+    if os.path.samestat(st1, st2) or files_share_extents(path1, path2):
+        return True
+
+    with open(path1, 'rb') as f1, open(path2, 'rb') as f2:
+        if f1.read(4096) != f2.read(4096):
             return False
+        while True:
+            chunk1 = f1.read(block_size)
+            chunk2 = f2.read(block_size)
+            if chunk1 != chunk2:
+                return False
+            if not chunk1:
+                return True
+
+
+def compare_files(path1, path2):
+    try:
+        return files_are_identical(path1, path2)
+    except Exception as e:
+        print(f"⚠️ Failed to compare {safe_path(path1)} and {safe_path(path2)}: {e}")
+        return False
+
+
+def dirs_are_identical(entries1, entries2, max_workers=8):
+    by_name1 = {entry.name: entry for entry in entries1}
+    by_name2 = {entry.name: entry for entry in entries2}
+
+    if by_name1.keys() != by_name2.keys():
+        return False
+
+    pairs = []
+    for name, entry1 in by_name1.items():
+        entry2 = by_name2[name]
+        if entry1.is_dir() or entry2.is_dir():
+            return False  # Nested dir comparison not implemented
+        pairs.append((entry1.path, entry2.path))
+
+    if len(pairs) <= 1:
+        return all(compare_files(path1, path2) for path1, path2 in pairs)
+
+    # Many small files are latency-bound (open/read/close per pair); overlap them
+    # on a few threads and stop scheduling as soon as one pair differs.
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(pairs))) as executor:
+        futures = [executor.submit(compare_files, path1, path2) for path1, path2 in pairs]
+        for future in as_completed(futures):
+            if not future.result():
+                for pending in futures:
+                    pending.cancel()
+                return False
 
     return True
 
 
-def fix_encoding(path, dry_run=True, confirm_rename=True, confirm_overwrite=True, list_command=None):
-    for root, dirs, files in os.walk(path, topdown=False):
-        for name in dirs + files:
-            try:
-                fixed_name = name.encode('latin1').decode('utf-8')
-                if fixed_name == name:
-                    continue
+def walk_bottom_up(path, recursive=True):
+    dir_entries = []
+    file_entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    dir_entries.append(entry)
+                else:
+                    file_entries.append(entry)
+    except OSError:
+        return
 
-                old_path = os.path.join(root, name)
-                new_path = os.path.join(root, fixed_name)
+    # Visit entries in inode order so the following stat/rename calls hit the
+    # inode table sequentially instead of in hashed dirent order.
+    dir_entries.sort(key=os.DirEntry.inode)
+    file_entries.sort(key=os.DirEntry.inode)
 
-                print(f"\n{'DRY RUN:' if dry_run else 'Found:'}")
-                print(f"  From: {safe_path(old_path)}")
-                print(f"    To: {safe_path(new_path)}")
+    if recursive:
+        for entry in dir_entries:
+            yield from walk_bottom_up(entry.path)
+    yield path, dir_entries, file_entries
 
-                if dry_run:
-                    continue
 
-                # 🧹 If old is empty directory, delete it
-                if os.path.isdir(old_path) and not os.listdir(old_path):
-                    print(f"📭 Old directory is empty — removing: {safe_path(old_path)}")
-                    os.rmdir(old_path)
-                    continue
+def format_found(dry_run, safe_old, safe_new):
+    return f"\n{'DRY RUN:' if dry_run else 'Found:'}\n  From: {safe_old}\n    To: {safe_new}"
 
-                # 🚀 If file and new path doesn't exist, rename without asking
-                if os.path.isfile(old_path) and not os.path.exists(new_path):
-                    os.rename(old_path, new_path)
-                    print("✅ Renamed (file, no conflict).")
-                    continue
 
-                # 📁 Directory → Directory handling
-                if os.path.isdir(old_path) and os.path.isdir(new_path):
-                    old_contents = os.listdir(old_path)
-                    new_contents = os.listdir(new_path)
-
-                    if not new_contents:
-                        print("📂 Target dir is empty — auto-merging.")
-                        move_dir_contents(old_path, new_path)
-                        print("✅ Merged and removed old directory.")
-                        continue
-
-                    if old_contents and new_contents and list_command:
-                        run_list_command(list_command, old_path, new_path)
-
-                    if dirs_are_identical(old_path, new_path):
-                        print("📎 Directories have same files with matching content — skipping move.")
-                        os.rmdir(old_path)
-                        print("🗑️  Deleted old directory.")
-                        continue
-
-                    if confirm_overwrite:
-                        ow = input("⚠️  Target dir has contents. Merge? [y/N]: ").strip().lower()
-                        if ow not in ("y", "yes"):
-                            print("⏩ Skipped.")
-                            continue
-                    else:
-                        print("⏩ Skipped: overwrite not allowed.")
-                        continue
+def fix_entry(root, entry, fixed_name, sibling_names, dry_run=True, confirm_rename=True, confirm_overwrite=True, list_command=None):
+    # Messages are collected and written in one go so parallel workers do not
+    # interleave their blocks; they are flushed early only before prompts and
+    # before helpers that print or run commands on their own.
+    messages = []
+    say = messages.append
 
-                    print("🔁 Merging directory contents...")
-                    move_dir_contents(old_path, new_path)
-                    print("✅ Merged and removed old directory.")
-                    continue
+    def flush():
+        if messages:
+            sys.stdout.write("\n".join(messages) + "\n")
+            messages.clear()
 
-                # 🧪 File → File conflict
-                if os.path.isfile(old_path) and os.path.isfile(new_path):
-                    if confirm_overwrite:
-                        choice = input(
-                            "⚠️  Target file exists. Overwrite? [s]kip / [y]es / [c]heck by hash: ").strip().lower()
-                        if choice == 's':
-                            print("⏩ Skipped.")
-                            continue
-                        elif choice == 'y':
-                            try:
-                                os.remove(new_path)
-                                print("🗑️  Deleted existing file before renaming.")
-                                os.rename(old_path, new_path)
-                                print("✅ Renamed.")
-                            except Exception as e:
-                                print(f"❌ Failed to overwrite: {e}")
-                            continue
-                        elif choice == 'c':
-                            try:
-                                hash_old = hash_file(old_path)
-                                hash_new = hash_file(new_path)
-                                if hash_old == hash_new:
-                                    print("🟰 Files have identical content — skipping.")
-                                    os.remove(old_path)
-                                    print("🗑️  Deleted duplicate old file.")
-                                    continue
-                                else:
-                                    print("❗ Files differ — proceeding to overwrite.")
-                                    os.remove(new_path)
-                                    os.rename(old_path, new_path)
-                                    print("✅ Renamed.")
-                            except Exception as e:
-                                print(f"❌ Failed during hash or rename: {e}")
-                            continue
+    try:
+        old_path = entry.path
+        new_path = os.path.join(root, fixed_name)
+        safe_old = safe_path(old_path)
+        safe_new = safe_path(new_path)
+
+        say(format_found(dry_run, safe_old, safe_new))
+
+        if dry_run:
+            return
+
+        # 🧹 If old is empty directory, delete it
+        old_contents = None
+        if entry.is_dir():
+            with os.scandir(old_path) as it:
+                old_contents = list(it)
+            if not old_contents:
+                say(f"📭 Old directory is empty — removing: {safe_old}")
+                os.rmdir(old_path)
+                return
+
+        # sibling_names is the directory listing plus earlier renames in it. A hit
+        # is only a hint to stat; a miss is trusted for files alone, because their
+        # rename below is atomic. Directories always stat the target, which also
+        # catches names that differ only by normalization or case, or just appeared.
+        target_exists = fixed_name in sibling_names
+
+        # 🚀 If file and new path doesn't exist, rename without asking
+        if entry.is_file() and not target_exists:
+            if rename_noreplace(old_path, new_path):
+                sibling_names.add(fixed_name)
+                say("✅ Renamed (file, no conflict).")
+                return
+            target_exists = True
+
+        # One stat of the target answers every conflict branch below
+        new_mode = 0
+        if target_exists or entry.is_dir():
+            try:
+                new_mode = os.stat(new_path).st_mode
+            except FileNotFoundError:
+                pass
+
+        # 📁 Directory → Directory handling
+        if entry.is_dir() and stat.S_ISDIR(new_mode):
+            with os.scandir(new_path) as it:
+                new_contents = list(it)
+
+            if not new_contents:
+                say("📂 Target dir is empty — auto-merging.")
+                flush()
+                move_dir_contents(old_path, new_path)
+                say("✅ Merged and removed old directory.")
+                return
+
+            if old_contents and new_contents and list_command:
+                flush()
+                run_list_command(list_command, old_path, new_path)
+
+            if dirs_are_identical(old_contents, new_contents):
+                say("📎 Directories have same files with matching content — skipping move.")
+                os.rmdir(old_path)
+                say("🗑️  Deleted old directory.")
+                return
+
+            if confirm_overwrite:
+                flush()
+                ow = input("⚠️  Target dir has contents. Merge? [y/N]: ").strip().lower()
+                if ow not in ("y", "yes"):
+                    say("⏩ Skipped.")
+                    return
+            else:
+                say("⏩ Skipped: overwrite not allowed.")
+                return
+
+            say("🔁 Merging directory contents...")
+            flush()
+            move_dir_contents(old_path, new_path)
+            say("✅ Merged and removed old directory.")
+            return
+
+        # 🧪 File → File conflict
+        if entry.is_file() and stat.S_ISREG(new_mode):
+            if confirm_overwrite:
+                flush()
+                choice = input(
+                    "⚠️  Target file exists. Overwrite? [s]kip / [y]es / [c]heck by hash: ").strip().lower()
+                if choice == 's':
+                    say("⏩ Skipped.")
+                    return
+                elif choice == 'y':
+                    try:
+                        os.remove(new_path)
+                        say("🗑️  Deleted existing file before renaming.")
+                        os.rename(old_path, new_path)
+                        say("✅ Renamed.")
+                    except Exception as e:
+                        say(f"❌ Failed to overwrite: {e}")
+                    return
+                elif choice == 'c':
+                    try:
+                        hash_old = hash_file(old_path)
+                        hash_new = hash_file(new_path)
+                        if hash_old == hash_new:
+                            say("🟰 Files have identical content — skipping.")
+                            os.remove(old_path)
+                            say("🗑️  Deleted duplicate old file.")
+                            return
                         else:
-                            print("⏩ Skipped.")
-                            continue
+                            say("❗ Files differ — proceeding to overwrite.")
+                            os.remove(new_path)
+                            os.rename(old_path, new_path)
+                            say("✅ Renamed.")
+                    except Exception as e:
+                        say(f"❌ Failed during hash or rename: {e}")
+                    return
+                else:
+                    say("⏩ Skipped.")
+                    return
+            else:
+                say("⏩ Skipped: overwrite not allowed.")
+                return
+
+        # ❓ For everything else, confirm rename
+        if confirm_rename:
+            flush()
+            answer = input("Rename? [Y/n]: ").strip().lower()
+            if answer not in ("", "y", "yes"):
+                say("⏩ Skipped.")
+                return
+
+        if not rename_noreplace(old_path, new_path):
+            say("⏩ Skipped: target already exists.")
+            return
+        sibling_names.add(fixed_name)
+        say("✅ Renamed.")
+
+    except Exception as e:
+        say(f"❌ Error processing {safe_path(entry.name)}: {e}")
+    finally:
+        flush()
+
+
+def fix_name(name):
+    if name.isascii() or not MOJIBAKE_RE.search(name):
+        return None
+    raw = name.encode('latin1', 'ignore')
+    if len(raw) != len(name):
+        # Contains code points beyond latin1, so it cannot be double-encoded UTF-8
+        return None
+    try:
+        fixed_name = raw.decode('utf-8')
+    except UnicodeDecodeError:
+        # print(f"⚠️ Skipping invalid name: {safe_path(name)}")
+        return None
+    if fixed_name == name:
+        return None
+    return fixed_name
+
+
+def fix_encoding(path, dry_run=True, confirm_rename=True, confirm_overwrite=True, list_command=None, recursive=True):
+    for root, dir_entries, file_entries in walk_bottom_up(path, recursive):
+        sibling_names = None
+        for entry in chain(dir_entries, file_entries):
+            fixed_name = fix_name(entry.name)
+            if fixed_name is None:
+                continue
+            if sibling_names is None:
+                sibling_names = {e.name for e in chain(dir_entries, file_entries)}
+            fix_entry(root, entry, fixed_name, sibling_names, dry_run, confirm_rename, confirm_overwrite, list_command)
+
+
+def fix_encoding_bulk(path, list_command=None, recursive=True):
+    # Non-interactive, non-dry-run fast path: conflict-free files are renamed
+    # atomically without walking the prompt ladder; every other entry, including
+    # any file whose target turns out to exist, is handled by fix_entry.
+    for root, dir_entries, file_entries in walk_bottom_up(path, recursive):
+        sibling_names = None
+        for entry in chain(dir_entries, file_entries):
+            fixed_name = fix_name(entry.name)
+            if fixed_name is None:
+                continue
+            if sibling_names is None:
+                sibling_names = {e.name for e in chain(dir_entries, file_entries)}
+
+            if entry.is_file() and fixed_name not in sibling_names:
+                old_path = entry.path
+                new_path = os.path.join(root, fixed_name)
+                try:
+                    if rename_noreplace(old_path, new_path):
+                        sibling_names.add(fixed_name)
+                        result = "✅ Renamed (file, no conflict)."
                     else:
-                        print("⏩ Skipped: overwrite not allowed.")
-                        continue
+                        result = None  # The target exists after all
+                except Exception as e:
+                    result = f"❌ Error processing {safe_path(entry.name)}: {e}"
+                if result is not None:
+                    # One write per decision keeps the block together when workers share stdout
+                    sys.stdout.write(f"{format_found(False, safe_path(old_path), safe_path(new_path))}\n{result}\n")
+                    continue
 
-                # ❓ For everything else, confirm rename
-                if confirm_rename:
-                    answer = input("Rename? [Y/n]: ").strip().lower()
-                    if answer not in ("", "y", "yes"):
-                        print("⏩ Skipped.")
-                        continue
+            fix_entry(root, entry, fixed_name, sibling_names, False, False, False, list_command)
 
-                os.rename(old_path, new_path)
-                print("✅ Renamed.")
 
-            except (UnicodeEncodeError, UnicodeDecodeError):
-                # print(f"⚠️ Skipping invalid name: {safe_path(name)}")
-                continue
-            except Exception as e:
-                print(f"❌ Error processing {safe_path(name)}: {e}")
-                continue
+def fix_encoding_parallel(fix_impl, path, max_workers=None, **kwargs):
+    # Subtrees are disjoint, so each top-level directory can be fixed on its own
+    # worker; the top-level names themselves are handled last, after their contents.
+    with os.scandir(path) as it:
+        subdirs = [entry.path for entry in it if entry.is_dir(follow_symlinks=False)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda subdir: fix_impl(subdir, **kwargs), subdirs))
+
+    fix_impl(path, recursive=False, **kwargs)
 
 
 if __name__ == "__main__":
@@ -217,12 +482,29 @@ if __name__ == "__main__":
     dry_run = parse_env_bool("DRY_RUN", True)
     confirm_rename = parse_env_bool("CONFIRM_RENAME", True)
     confirm_overwrite = parse_env_bool("CONFIRM_OVERWRITE", True)
-    list_command = os.environ.get("LIST_COMMAND", "find")
-
-    fix_encoding(
-        path=target_path,
-        dry_run=dry_run,
-        confirm_rename=confirm_rename,
-        confirm_overwrite=confirm_overwrite,
-        list_command=list_command
-    )
+    list_command = shlex.split(os.environ.get("LIST_COMMAND", "find"))
+    max_workers = int(os.environ.get("MAX_WORKERS", os.cpu_count() or 1))
+
+    if blake3 is not None:
+        print("🔐 Hashing with BLAKE3.")
+    else:
+        print(f"🔐 Hashing with SHA-256 ({ssl.OPENSSL_VERSION}).")
+
+    interactive = confirm_rename or confirm_overwrite
+    if not dry_run and not interactive:
+        fix_impl = fix_encoding_bulk
+        fix_kwargs = {"list_command": list_command}
+    else:
+        fix_impl = fix_encoding
+        fix_kwargs = {
+            "dry_run": dry_run,
+            "confirm_rename": confirm_rename,
+            "confirm_overwrite": confirm_overwrite,
+            "list_command": list_command,
+        }
+
+    if interactive or max_workers <= 1:
+        # Interactive prompts need a single, ordered stream of questions
+        fix_impl(target_path, **fix_kwargs)
+    else:
+        fix_encoding_parallel(fix_impl, target_path, max_workers=max_workers, **fix_kwargs)
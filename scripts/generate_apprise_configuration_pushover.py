@@ -1,9 +1,15 @@
 import json
-import yaml
+import re
 import argparse
+from itertools import chain
 from pathlib import Path
 from typing import Any
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 DEFAULT_PRIORITIES = [-2, -1, 0, 1]  # emergency removed
 DEFAULT_PRIORITY = 0
 PRIORITY_NAMES = {
@@ -14,10 +20,28 @@ PRIORITY_NAMES = {
     2: "emergency",  # still valid if explicitly provided in JSON
 }
 
+# Pushover URL around the app name; only the name and priority vary
+URL_PREFIX = "pover://{{ op://Docker/Apprise/Pushover/User-Key }}@{{ op://Docker/Apprise/Pushover/"
+URL_SUFFIX = "-Key }}?priority="
+
+# Fixed layout of the generated Apprise configuration
+YAML_HEADER = "---\nversion: 1\nurls:\n"
+YAML_ENTRY = "- {}:\n  - tag: {}\n"
+
+# Strings YAML would read as something else (or not at all) when left unquoted
+YAML_NEEDS_QUOTES = re.compile(
+    r"""^$|^[\s\-?:,\[\]{}#&*!|>'"%@`]|[\x00-\x1f\x7f-\x9f\ufeff\u2028\u2029\ud800-\udfff\ufffe\uffff]|: | #|[\s:]$"""
+    r"|^(?:~|null|true|false|yes|no|on|off|y|n|<<|=|[-+]?\.?[0-9].*|[-+]?\.inf|\.nan)$",
+    re.IGNORECASE,
+)
+
+# Characters that must be escaped inside a double-quoted YAML scalar
+YAML_ESCAPE_RE = re.compile(r'["\\\x00-\x1f\x7f-\x9f\ufeff\u2028\u2029\ud800-\udfff\ufffe\uffff]')
 
-def app_to_yaml_entries(app: dict[str, Any]) -> list[dict[str, Any]]:
+
+def app_to_yaml_entries(app: dict[str, Any]) -> list[tuple[str, str]]:
     """
-    Convert a single App definition to multiple YAML URL entries,
+    Convert a single App definition to multiple (url, tag) YAML URL entries,
     one for each priority level.
     If the current priority equals the app's defaultPriority,
     include the raw tags as well as the suffixed tags.
@@ -30,56 +54,72 @@ def app_to_yaml_entries(app: dict[str, Any]) -> list[dict[str, Any]]:
     if not priorities:
         priorities = DEFAULT_PRIORITIES
 
+    get_name = PRIORITY_NAMES.get
+    base_url = URL_PREFIX + name + URL_SUFFIX
     entries = []
     for prio in priorities:
-        prio_name = PRIORITY_NAMES.get(prio, str(prio))  # fallback to str if unknown
+        prio_name = get_name(prio) or str(prio)  # fallback to str if unknown
 
         # Construct URL with ?priority= suffix
-        url = (
-            f"pover://{{{{ op://Docker/Apprise/Pushover/User-Key }}}}"
-            f"@{{{{ op://Docker/Apprise/Pushover/{name}-Key }}}}"
-            f"?priority={prio_name}"
-        )
+        url = base_url + prio_name
 
+        suffixed = [tag + "-" + prio_name for tag in tags]
         if prio == default_priority:
             # include both raw tags and suffixed tags
-            tagged = tags + [f"{tag}-{prio_name}" for tag in tags]
+            tagged = tags + suffixed
         else:
-            tagged = [f"{tag}-{prio_name}" for tag in tags]
+            tagged = suffixed
 
         joined_tags = ", ".join(tagged)
-        entries.append({url: [{"tag": joined_tags}]})
+        entries.append((url, joined_tags))
 
     return entries
 
 
+def yaml_escape_char(match: re.Match) -> str:
+    char = match.group()
+    if char in '"\\':
+        return "\\" + char
+    code = ord(char)
+    if code <= 0xFF:
+        return f"\\x{code:02X}"
+    return f"\\u{code:04X}"
+
+
+def yaml_scalar(value: str) -> str:
+    """
+    Render a string as a YAML scalar, plain where that is unambiguous.
+    Anything else is double-quoted, escaping only what YAML cannot hold literally;
+    all other characters (including non-BMP ones like emoji) are kept as they are.
+    """
+    if YAML_NEEDS_QUOTES.search(value):
+        return '"' + YAML_ESCAPE_RE.sub(yaml_escape_char, value) + '"'
+    return value
+
+
+def render_yaml(urls: list[tuple[str, str]]) -> str:
+    """
+    Render the Apprise configuration without going through PyYAML.
+    The document always has the same shape (version + list of single-key
+    URL mappings with a tag), so it is written out directly line by line.
+    """
+    entry = YAML_ENTRY.format
+    return YAML_HEADER + "".join([entry(yaml_scalar(url), yaml_scalar(tag)) for url, tag in urls])
+
+
 def json_to_yaml(json_path: Path, yaml_path: Path) -> None:
     """
     Convert a JSON array of apps into a YAML file with a custom format.
     """
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            apps: list[dict[str, Any]] = json.load(f)
-    except json.JSONDecodeError as e:
+        with open(json_path, "rb") as f:
+            apps: list[dict[str, Any]] = json_loads(f.read())
+    except json.JSONDecodeError as e:  # also raised by orjson
         raise ValueError(f"Invalid JSON file: {json_path}\n{e}")
 
-    output_list = []
-    for app in apps:
-        output_list.extend(app_to_yaml_entries(app))
-
-    final_output = {"version": 1, "urls": output_list}
-
-    with open(yaml_path, "w", encoding="utf-8") as f:
-        yaml.safe_dump(
-            final_output,
-            f,
-            explicit_start=True,  # adds ---
-            default_flow_style=False,
-            indent=2,
-            allow_unicode=True,
-            sort_keys=False,
-            width=200
-        )
+    output_list = list(chain.from_iterable(map(app_to_yaml_entries, apps)))
+
+    yaml_path.write_bytes(render_yaml(output_list).encode("utf-8"))
 
 
 def main():
@@ -1,11 +1,23 @@
+import gzip
+import io
 import json
 import sys
 import argparse
-from collections import defaultdict
-from string import Template
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from functools import lru_cache
+from html import escape
+from itertools import chain, repeat
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 UPDATE_TYPES = ["repo", "user", "image", "tag", "sha"]
 CHANGE_TYPES = ["created", "updated", "deleted"]
+# Bit per update type, in checkbox order, for the filter's update type masks
+UPDATE_TYPE_BITS = {t: 1 << i for i, t in enumerate(UPDATE_TYPES)}
 
 UPDATE_TYPE_CLASSES = {
     "separator": "ut-separator",
@@ -17,32 +29,34 @@ UPDATE_TYPE_CLASSES = {
     "sha": "ut-sha",
 }
 
-COMMAND_TEMPLATE = Template(
-    "sudo python3 \"${repo}/scripts/snapshot_docker_compose_stack.py\" "
-    "-v -D -u "
-    "-d \"${repo}/compose/${section}/${project}\" "
-    "-c ${container} "
-    "-C ${commit}"
+# One filter checkbox: name, value, ' checked' or '', label
+CHECKBOX_HTML = '<label><input type="checkbox" name="%s" value="%s"%s onchange="applyFilters()"> %s</label><br>'
+
+
+def checkboxes_html(name, values, unchecked=()):
+    # values must already be HTML-escaped
+    return '\n'.join([CHECKBOX_HTML % (name, v, '' if v in unchecked else ' checked', v) for v in values])
+
+
+# Filter checkboxes for the fixed update/change types
+UPDATE_TYPE_FILTERS_HTML = checkboxes_html('updateType', UPDATE_TYPES, unchecked={'sha'})
+CHANGE_TYPE_FILTERS_HTML = checkboxes_html('changeType', CHANGE_TYPES)
+
+CONTAINER_HTML = (
+    '<div class="container">'
+    '<strong>Container:</strong> <code>{container_name}</code><br>'
+    '<div class="image-info">'
+    '<strong>Old Image:</strong> <code>{old_image_html}</code><br>'
+    '<strong>New Image:</strong> <code>{new_image_html}</code><br>'
+    '</div>'
+    '<strong>Update Types:</strong> {styled_updates}<br>'
+    '<strong>Command:</strong> <code>{command}</code>'
+    '</div>'
 )
 
 
-def format_command(section, project, container, commit, repo):
-    return COMMAND_TEMPLATE.substitute(repo=repo, section=section, project=project, container=container, commit=commit)
-
-
-def generate_html(data, repo):
-    # Collect distinct sections and projects for filters
-    sections_set = set()
-    projects_set = set()
-    for commit_entry in data:
-        for project in commit_entry['projects']:
-            sections_set.add(project['section'])
-            projects_set.add(project['project'])
-    sections = sorted(sections_set)
-    projects = sorted(projects_set)
-
-    html = '<!DOCTYPE html>'
-    html += '''
+# Everything up to the data-dependent section/project filters
+HEAD_HTML = '''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -188,16 +202,15 @@ def generate_html(data, repo):
             });
         });
     
-        // Safer checkbox lookup helpers
+        // Static elements, collected once at DOMContentLoaded (see cacheElements)
+        let filterInputs = null;      // checkbox name -> inputs, in document order
+        let filterCheckboxes = null;  // checkbox name -> Map(value -> input)
+        let projectButtons = [];
+        let sectionButtons = [];
+
+        // Checkbox lookup helpers
         function getCheckboxByNameValue(name, value) {
-            // Try CSS.escape if available
-            if (window.CSS && CSS.escape) {
-                const sel = 'input[name="' + name + '"][value="' + CSS.escape(value) + '"]';
-                const bySelector = document.querySelector(sel);
-                if (bySelector) return bySelector;
-            }
-            // Fallback: linear scan
-            return Array.from(document.querySelectorAll('input[name="' + name + '"]')).find(cb => cb.value === value) || null;
+            return filterCheckboxes[name].get(value) || null;
         }
 
         function getProjectCheckbox(projectName) {
@@ -224,8 +237,7 @@ def generate_html(data, repo):
         }
 
         function updateProjectButtons() {
-            const buttons = document.querySelectorAll('.toggle-project-btn');
-            buttons.forEach(btn => {
+            projectButtons.forEach(btn => {
                 const proj = btn.getAttribute('data-project');
                 const cb = getProjectCheckbox(proj);
                 const isChecked = cb ? cb.checked : true;
@@ -236,8 +248,7 @@ def generate_html(data, repo):
         }
 
         function updateSectionButtons() {
-            const buttons = document.querySelectorAll('.toggle-section-btn');
-            buttons.forEach(btn => {
+            sectionButtons.forEach(btn => {
                 const sec = btn.getAttribute('data-section');
                 const cb = getSectionCheckbox(sec);
                 const isChecked = cb ? cb.checked : true;
@@ -247,57 +258,100 @@ def generate_html(data, repo):
             });
         }
 
-        function applyFilters() {
-            const selectedUpdateTypes = Array.from(document.querySelectorAll('input[name="updateType"]:checked')).map(cb => cb.value);
-            const selectedChangeTypes = Array.from(document.querySelectorAll('input[name="changeType"]:checked')).map(cb => cb.value);
-            const selectedSections   = Array.from(document.querySelectorAll('input[name="sectionFilter"]:checked')).map(cb => cb.value);
-            const selectedProjects   = Array.from(document.querySelectorAll('input[name="projectFilter"]:checked')).map(cb => cb.value);
-
-            const allProjects = document.querySelectorAll('.project');
-            const allContainers = document.querySelectorAll('.container');
-            const allCommits = document.querySelectorAll('.commit');
-            const allProjectDividers = document.querySelectorAll('.project-divider');
-            const allSectionDividers = document.querySelectorAll('.section-divider');
-
-            // Container-level filter: update types
-            allContainers.forEach(container => {
-                const updateTypes = container.getAttribute('data-update-types').split(',');
-                const matchUpdate = selectedUpdateTypes.some(val => updateTypes.includes(val));
-                container.style.display = matchUpdate ? 'block' : 'none';
+        // Filter index, built once by cacheElements: each project with its filter attributes
+        // (from the #filterData blob, which lists projects in document order),
+        // its containers and the commit/divider elements that wrap it
+        let filterIndex = null;
+
+        function buildFilterIndex() {
+            const filterData = JSON.parse(document.getElementById('filterData').textContent);
+            const projects = Array.from(document.querySelectorAll('.project')).map((el, i) => ({
+                el,
+                changeType: filterData[i].changeType,
+                section: filterData[i].section,
+                project: filterData[i].project,
+                containers: Array.from(el.querySelectorAll('.container'), (c, j) => ({
+                    el: c,
+                    updateTypes: filterData[i].updateTypes[j],  // bitmask over the updateType checkboxes
+                })),
+                parents: [el.closest('.commit'), el.closest('.project-divider'), el.closest('.section-divider')].filter(Boolean),
+            }));
+            const groups = Array.from(document.querySelectorAll('.commit, .project-divider')).map(el => ({el, section: null}))
+                .concat(Array.from(document.querySelectorAll('.section-divider')).map(el => ({el, section: el.dataset.section})));
+            return {projects, groups};
+        }
+
+        function cacheElements() {
+            filterInputs = {};
+            filterCheckboxes = {};
+            ['updateType', 'changeType', 'sectionFilter', 'projectFilter'].forEach(name => {
+                const inputs = Array.from(document.querySelectorAll('input[name="' + name + '"]'));
+                filterInputs[name] = inputs;
+                filterCheckboxes[name] = new Map(inputs.map(cb => [cb.value, cb]));
             });
+            projectButtons = Array.from(document.querySelectorAll('.toggle-project-btn'));
+            sectionButtons = Array.from(document.querySelectorAll('.toggle-section-btn'));
+            filterIndex = buildFilterIndex();
+        }
 
-            // Project-level filter: change type + section + project + has visible container
-            allProjects.forEach(project => {
-                const changeType = project.getAttribute('data-change-type');
-                const section = project.getAttribute('data-section');
-                const projName = project.getAttribute('data-project');
+        function checkedMask(name) {
+            let mask = 0;
+            filterInputs[name].forEach((cb, i) => {
+                if (cb.checked) mask |= 1 << i;
+            });
+            return mask;
+        }
 
-                const matchChange = selectedChangeTypes.includes(changeType);
-                const matchSection = selectedSections.includes(section);
-                const matchProject = selectedProjects.includes(projName);
+        function checkedValues(name) {
+            return new Set(filterInputs[name].filter(cb => cb.checked).map(cb => cb.value));
+        }
 
-                const visibleContainers = Array.from(project.querySelectorAll('.container')).some(c => c.style.display !== 'none');
-                project.style.display = (matchChange && matchSection && matchProject && visibleContainers) ? 'block' : 'none';
-            });
+        let pendingFilterFrame = 0;
 
-            // Commit-level visibility: hide commits with no visible projects
-            allCommits.forEach(commit => {
-                const visibleProjects = Array.from(commit.querySelectorAll('.project')).some(p => p.style.display !== 'none');
-                commit.style.display = visibleProjects ? 'block' : 'none';
+        function applyFilters() {
+            const selectedUpdateTypes = checkedMask('updateType');
+            const selectedChangeTypes = checkedValues('changeType');
+            const selectedSections   = checkedValues('sectionFilter');
+            const selectedProjects   = checkedValues('projectFilter');
+
+            // Decide visibility first without touching the DOM, then apply
+            // all display changes together in the next animation frame
+            const elements = [];
+            const displays = [];
+
+            // Container-level filter (update types), then project-level filter
+            // (change type + section + project + has visible container)
+            const visibleParents = new Set();
+            filterIndex.projects.forEach(project => {
+                let visibleContainers = false;
+                project.containers.forEach(container => {
+                    const matchUpdate = (container.updateTypes & selectedUpdateTypes) !== 0;
+                    elements.push(container.el);
+                    displays.push(matchUpdate ? 'block' : 'none');
+                    visibleContainers = visibleContainers || matchUpdate;
+                });
+
+                const visible = visibleContainers
+                    && selectedChangeTypes.has(project.changeType)
+                    && selectedSections.has(project.section)
+                    && selectedProjects.has(project.project);
+                elements.push(project.el);
+                displays.push(visible ? 'block' : 'none');
+                if (visible) project.parents.forEach(parent => visibleParents.add(parent));
             });
 
-            // Project-divider visibility (only in section view)
-            allProjectDividers.forEach(divider => {
-                const visibleProjects = Array.from(divider.querySelectorAll('.project')).some(p => p.style.display !== 'none');
-                divider.style.display = visibleProjects ? 'block' : 'none';
+            // Commits and (section view) dividers: hide those with no visible projects
+            filterIndex.groups.forEach(group => {
+                const sectionSelected = group.section === null || selectedSections.has(group.section);
+                elements.push(group.el);
+                displays.push((sectionSelected && visibleParents.has(group.el)) ? 'block' : 'none');
             });
 
-            // Section-divider visibility (only in section view)
-            allSectionDividers.forEach(divider => {
-                const section = divider.getAttribute('data-section');
-                const sectionSelected = selectedSections.includes(section);
-                const visibleProjects = Array.from(divider.querySelectorAll('.project')).some(p => p.style.display !== 'none');
-                divider.style.display = (sectionSelected && visibleProjects) ? 'block' : 'none';
+            cancelAnimationFrame(pendingFilterFrame);
+            pendingFilterFrame = requestAnimationFrame(() => {
+                for (let i = 0; i < elements.length; i++) {
+                    elements[i].style.display = displays[i];
+                }
             });
 
             // Keep toggle buttons in sync
@@ -307,8 +361,10 @@ def generate_html(data, repo):
 
         function toggleView() {
             const mode = document.getElementById('viewMode').value;
-            document.getElementById('commitView').style.display = mode === 'commitView' ? 'block' : 'none';
-            document.getElementById('sectionView').style.display = mode === 'sectionView' ? 'block' : 'none';
+            ['commitView', 'sectionView'].forEach(id => {
+                const view = document.getElementById(id);
+                if (view) view.style.display = mode === id ? 'block' : 'none';
+            });
             applyFilters();
         }
 
@@ -317,6 +373,15 @@ def generate_html(data, repo):
         }
 
         document.addEventListener('DOMContentLoaded', () => {
+            cacheElements();
+
+            // Reports generated with --no-section-view only contain the commit view
+            if (!document.getElementById('sectionView')) {
+                const viewMode = document.getElementById('viewMode');
+                viewMode.querySelector('option[value="sectionView"]').remove();
+                viewMode.value = 'commitView';
+            }
+
             // Click-to-copy for code blocks
             document.querySelectorAll('code').forEach(code => {
                 code.addEventListener('click', () => copyToClipboard(code.textContent));
@@ -337,14 +402,16 @@ def generate_html(data, repo):
             });
 
             // Keep button labels synced when user changes filters manually
-            document.querySelectorAll('input[name="projectFilter"]').forEach(cb => {
+            filterInputs.projectFilter.forEach(cb => {
                 cb.addEventListener('change', updateProjectButtons);
             });
-            document.querySelectorAll('input[name="sectionFilter"]').forEach(cb => {
+            filterInputs.sectionFilter.forEach(cb => {
                 cb.addEventListener('change', updateSectionButtons);
             });
 
-            toggleView(); // also calls applyFilters -> syncs button labels
+            // Initial filter pass once the browser is idle, so the first paint
+            // is not held up by it; also calls applyFilters -> syncs button labels
+            (window.requestIdleCallback || window.requestAnimationFrame)(() => toggleView());
         });
     </script>
 </head>
@@ -365,146 +432,235 @@ def generate_html(data, repo):
 <div class="filters">
     <fieldset>
         <legend>Filter by update_type:</legend>
-''' + '\n'.join([f'<label><input type="checkbox" name="updateType" value="{t}" ' + (
-        '' if t == 'sha' else 'checked') + f' onchange="applyFilters()"> {t}</label><br>' for t in UPDATE_TYPES]) + '''
+''' + UPDATE_TYPE_FILTERS_HTML + '''
     </fieldset>
     <fieldset>
         <legend>Filter by change_type:</legend>
-''' + '\n'.join([
-        f'<label><input type="checkbox" name="changeType" value="{t}" checked onchange="applyFilters()"> {t}</label><br>'
-        for
-        t
-        in
-        CHANGE_TYPES]) + '''
+''' + CHANGE_TYPE_FILTERS_HTML + '''
     </fieldset>
     <fieldset>
         <legend>Filter by section:</legend>
-''' + '\n'.join([
-        f'<label><input type="checkbox" name="sectionFilter" value="{s}" checked onchange="applyFilters()"> {s}</label><br>'
-        for
-        s
-        in
-        sections]) + '''
+'''
+
+# Static markup between the section and project filters, and from there to the commit view
+SECTION_TO_PROJECT_FILTERS_HTML = '''
     </fieldset>
     <fieldset>
         <legend>Filter by project:</legend>
-''' + '\n'.join([
-        f'<label><input type="checkbox" name="projectFilter" value="{p}" checked onchange="applyFilters()"> {p}</label><br>'
-        for
-        p
-        in
-        projects]) + '''
+'''
+FILTERS_TO_COMMIT_VIEW_HTML = '''
     </fieldset>
 </div>
 <hr>
 <div id="commitView" style="display:none">
 '''
 
-    for commit_entry in data:
-        commit_html = f'<div class="commit"><strong>Commit:</strong> <code>{commit_entry["commit"]}</code>'
-        project_htmls = []
-
-        for project in commit_entry['projects']:
-            containers_html = ''
-            for container in project['containers']:
-                update_types = ','.join(container['update_types'])
-                command = format_command(project['section'], project['project'], container['container_name'],
-                                         commit_entry['commit'], repo)
-                styled_updates = ' '.join([
-                    f'<span class="{UPDATE_TYPE_CLASSES.get(t, "")}">{t}</span>' for t in container['update_types']
-                ])
-                old_image_html, new_image_html = image_diff_to_html(container['image']['old'],
-                                                                    container['image']['new'])
-                containers_html += f'''<div class="container" data-update-types="{update_types}">
-                    <strong>Container:</strong> <code>{container['container_name']}</code><br>
-                    <div class="image-info">
-                        <strong>Old Image:</strong> <code>{old_image_html}</code><br>
-                        <strong>New Image:</strong> <code>{new_image_html}</code><br>
-                    </div>
-                    <strong>Update Types:</strong> {styled_updates}<br>
-                    <strong>Command:</strong> <code>{command}</code>
-                </div>'''
-
-            if containers_html:
-                project_html = (
-                    f'<div class="project" '
-                    f'data-change-type="{project["change_type"]}" '
-                    f'data-section="{project["section"]}" '
-                    f'data-project="{project["project"]}">'
-                    f'<strong>Section:</strong> <code>{project["section"]}</code> '
-                    f'<span class="project-controls"><button class="btn toggle-section-btn" data-section="{project["section"]}" title="Disable this section in the filter">Hide section</button></span><br>'
-                    f'<strong>Project:</strong> <code>{project["project"]}</code> '
-                    f'<span class="project-controls"><button class="btn toggle-project-btn" data-project="{project["project"]}" title="Disable this project in the filter">Hide project</button></span><br>'
-                    f'<strong>Change Type:</strong> <span class="{project["change_type"]}">{project["change_type"]}</span>'
-                    f'{containers_html}'
-                    f'</div>'
-                )
-                project_htmls.append(project_html)
-
-        if project_htmls:
-            commit_html += ''.join(project_htmls) + '</div>'
-            html += commit_html
-
-    html += '</div>'
-
-    section_html = '<div id="sectionView">'
-    section_map = defaultdict(list)
-
-    for entry in data:
-        for project in entry['projects']:
-            section_map[project['section']].append({
-                'commit': entry['commit'],
-                'project': project
-            })
-
-    for section in sorted(section_map.keys()):
-        section_html += f'<div class="section-divider" data-section="{section}"><h2 class="section-header">Section: <code>{section}</code> <button class="btn toggle-section-btn" data-section="{section}" title="Disable this section in the filter">Hide section</button></h2>'
-        project_groups = defaultdict(list)
-        for item in section_map[section]:
-            project_groups[item['project']['project']].append(item)
-
-        for project_name in sorted(project_groups.keys()):
-            section_html += f'<div class="project-divider" data-project="{project_name}"><h3>Project: <code>{project_name}</code></h3>'
-            for item in project_groups[project_name]:
-                project = item['project']
-                containers_html = ''
-                for container in project['containers']:
-                    update_types = ','.join(container['update_types'])
-                    command = format_command(project['section'], project['project'], container['container_name'],
-                                             item['commit'], repo)
-                    styled_updates = ' '.join([
-                        f'<span class="{UPDATE_TYPE_CLASSES.get(t, "")}">{t}</span>' for t in container['update_types']
-                    ])
-                    old_image_html, new_image_html = image_diff_to_html(container['image']['old'],
-                                                                        container['image']['new'])
-                    containers_html += f'''<div class="container" data-update-types="{update_types}">
-                        <strong>Container:</strong> <code>{container['container_name']}</code><br>
-                        <div class="image-info">
-                            <strong>Old Image:</strong> <code>{old_image_html}</code><br>
-                            <strong>New Image:</strong> <code>{new_image_html}</code><br>
-                        </div>
-                        <strong>Update Types:</strong> {styled_updates}<br>
-                        <strong>Command:</strong> <code>{command}</code>
-                    </div>'''
+
+@lru_cache(maxsize=None)
+def escape_html(value):
+    # Image parts, commits and names repeat throughout the report
+    return escape(value)
+
+
+def format_command(section, project, container, commit, repo):
+    return (
+        f"sudo python3 \"{repo}/scripts/snapshot_docker_compose_stack.py\" "
+        "-v -D -u "
+        f"-d \"{repo}/compose/{section}/{project}\" "
+        f"-c {container} "
+        f"-C {commit}"
+    )
+
+
+# Containers share a handful of update type combinations, so both are memoized per tuple
+@lru_cache(maxsize=None)
+def update_types_mask(update_types):
+    return sum(UPDATE_TYPE_BITS.get(t, 0) for t in set(update_types))
+
+
+@lru_cache(maxsize=None)
+def update_types_html(update_types):
+    return ' '.join([f'<span class="{UPDATE_TYPE_CLASSES.get(t, "")}">{escape_html(t)}</span>' for t in update_types])
+
+
+def project_filter_data(project):
+    return {
+        'changeType': project['change_type'],
+        'section': project['section'],
+        'project': project['project'],
+        'updateTypes': [update_types_mask(tuple(container['update_types'])) for container in project['containers']],
+    }
+
+
+def container_to_html(project, container, commit, repo):
+    command = format_command(project['section'], project['project'], container['container_name'], commit, repo)
+    styled_updates = update_types_html(tuple(container['update_types']))
+    old_image_html, new_image_html = image_diff_to_html(container['image']['old'], container['image']['new'])
+    return CONTAINER_HTML.format_map({
+        'container_name': escape_html(container['container_name']),
+        'old_image_html': old_image_html,
+        'new_image_html': new_image_html,
+        'styled_updates': styled_updates,
+        'command': escape(command),
+    })
+
+
+def generate_html(data, repo, jobs=1, section_view=True):
+    out = io.StringIO()
+    write_html(data, repo, out, jobs, section_view)
+    return out.getvalue()
+
+
+def render_commit_containers(commits, repo):
+    # Container markup for each project of each commit, as nested lists in input order
+    return [
+        [
+            ''.join([container_to_html(project, container, commit_entry['commit'], repo)
+                     for container in project['containers']])
+            for project in commit_entry['projects']
+        ]
+        for commit_entry in commits
+    ]
+
+
+def render_all_containers(data, repo, jobs=1):
+    if jobs <= 1 or len(data) < 2:
+        return render_commit_containers(data, repo)
+    # Several chunks per worker so an expensive stretch of commits does not stall the pool
+    chunk_size = max(1, len(data) // (jobs * 4))
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(chain.from_iterable(executor.map(render_commit_containers, chunks, repeat(repo))))
+
+
+def write_html(data, repo, out, jobs=1, section_view=True):
+    esc = escape_html
+    # section -> project -> [(commit, project)] for the section view; its keys
+    # are also the distinct sections and projects for the filters
+    section_map = {}
+    if section_view:
+        for commit_entry in data:
+            commit = commit_entry['commit']
+            for project in commit_entry['projects']:
+                section_map.setdefault(project['section'], {}).setdefault(project['project'], []).append((commit, project))
+        sections = sorted(section_map)
+        projects = sorted({project_key for project_groups in section_map.values() for project_key in project_groups})
+    else:
+        all_projects = [project for commit_entry in data for project in commit_entry['projects']]
+        sections = sorted({project['section'] for project in all_projects})
+        projects = sorted({project['project'] for project in all_projects})
+
+    # Filter attributes of each rendered project, in document order
+    filter_data = []
+    # Container markup per project, rendered once for both views
+    rendered_containers = {}
+
+    w = out.write
+    w(HEAD_HTML)
+    w(checkboxes_html('sectionFilter', map(esc, sections)))
+    w(SECTION_TO_PROJECT_FILTERS_HTML)
+    w(checkboxes_html('projectFilter', map(esc, projects)))
+    w(FILTERS_TO_COMMIT_VIEW_HTML)
+
+    for commit_entry, commit_containers in zip(data, render_all_containers(data, repo, jobs)):
+        commit_open = False
+
+        for project, containers_html in zip(commit_entry['projects'], commit_containers):
+            rendered_containers[id(project)] = containers_html
+            if not containers_html:
+                continue
+
+            # Commits without any rendered project are left out entirely
+            if not commit_open:
+                w(f'<div class="commit"><strong>Commit:</strong> <code>{esc(commit_entry["commit"])}</code>')
+                commit_open = True
+            filter_data.append(project_filter_data(project))
+            section = esc(project['section'])
+            project_name = esc(project['project'])
+            change_type = esc(project['change_type'])
+            w(
+                f'<div class="project">'
+                f'<strong>Section:</strong> <code>{section}</code> '
+                f'<span class="project-controls"><button class="btn toggle-section-btn" data-section="{section}" title="Disable this section in the filter">Hide section</button></span><br>'
+                f'<strong>Project:</strong> <code>{project_name}</code> '
+                f'<span class="project-controls"><button class="btn toggle-project-btn" data-project="{project_name}" title="Disable this project in the filter">Hide project</button></span><br>'
+                f'<strong>Change Type:</strong> <span class="{change_type}">{change_type}</span>'
+            )
+            w(containers_html)
+            w('</div>')
+
+        if commit_open:
+            w('</div>')
+
+    w('</div>')
+
+    if section_view:
+        write_section_view(sections, section_map, rendered_containers, filter_data, w)
+
+    w('<script id="filterData" type="application/json">')
+    w(json.dumps(filter_data, separators=(',', ':')).replace('</', '<\\/'))
+    w('</script>')
+    w('</body>\n</html>')
+
+
+def write_section_view(sections, section_map, rendered_containers, filter_data, w):
+    esc = escape_html
+    w('<div id="sectionView">')
+    for section_key in sections:
+        section = esc(section_key)
+        w(f'<div class="section-divider" data-section="{section}"><h2 class="section-header">Section: <code>{section}</code> <button class="btn toggle-section-btn" data-section="{section}" title="Disable this section in the filter">Hide section</button></h2>')
+        project_groups = section_map[section_key]
+
+        for project_key in sorted(project_groups):
+            project_name = esc(project_key)
+            w(f'<div class="project-divider" data-project="{project_name}"><h3>Project: <code>{project_name}</code></h3>')
+            for commit, project in project_groups[project_key]:
+                # Same project object (and commit) as in the commit view
+                containers_html = rendered_containers[id(project)]
                 if containers_html:
-                    section_html += f'''<div class="project"
-                        data-change-type="{project['change_type']}"
-                        data-section="{section}"
-                        data-project="{project_name}">
-                        <div class="project-controls" style="float:right; margin-top:-24px;">
-                            <button class="btn toggle-project-btn" data-project="{project_name}" title="Disable this project in the filter">Hide project</button>
-                        </div>
-                        <strong>Commit:</strong> <code>{item['commit']}</code><br>
-                        <strong>Change Type:</strong> <span class="{project['change_type']}">{project['change_type']}</span>
-                        {containers_html}
-                    </div>'''
-            section_html += '</div>'
-        section_html += '</div>'
-
-    section_html += '</div>'
-    html += section_html
-    html += '</body>\n</html>'
-    return html
+                    change_type = esc(project['change_type'])
+                    filter_data.append(project_filter_data(project))
+                    w(
+                        f'<div class="project">'
+                        f'<div class="project-controls" style="float:right; margin-top:-24px;">'
+                        f'<button class="btn toggle-project-btn" data-project="{project_name}" title="Disable this project in the filter">Hide project</button>'
+                        f'</div>'
+                        f'<strong>Commit:</strong> <code>{esc(commit)}</code><br>'
+                        f'<strong>Change Type:</strong> <span class="{change_type}">{change_type}</span>'
+                    )
+                    w(containers_html)
+                    w('</div>')
+            w('</div>')
+        w('</div>')
+
+    w('</div>')
+
+
+@lru_cache(maxsize=None)
+def color_diff(update_type: str, old: str, new: str) -> tuple[str, str]:
+    # Color only the characters that changed, using difflib.SequenceMatcher.
+    # Memoized: the same repo/user/image/tag pairs recur across containers and commits.
+    if old == new:
+        escaped = escape_html(old)
+        return escaped, escaped
+    esc = escape_html
+    span_open = f'<span class="{UPDATE_TYPE_CLASSES[update_type]}">'
+    old_colored = []
+    new_colored = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old, new).get_opcodes():
+        old_part = esc(old[i1:i2])
+        new_part = esc(new[j1:j2])
+        if tag == 'equal' or old_part == new_part:
+            old_colored.append(old_part)
+            new_colored.append(new_part)
+        elif tag == 'delete':
+            old_colored.append(f'{span_open}{old_part}</span>')
+        elif tag == 'insert':
+            new_colored.append(f'{span_open}{new_part}</span>')
+        else:
+            old_colored.append(f'{span_open}{old_part}</span>')
+            new_colored.append(f'{span_open}{new_part}</span>')
+    return ''.join(old_colored), ''.join(new_colored)
 
 
 def image_diff_to_html(old_image_json: dict, new_image_json: dict, only_exact: bool = True) -> tuple[str, str]:
@@ -521,27 +677,6 @@ def image_diff_to_html(old_image_json: dict, new_image_json: dict, only_exact: b
     new_tag: str = new_image_json['tag']
     new_sha: str = new_image_json['sha']
     if only_exact:
-        # Color only the characters that changed, using difflib.SequenceMatcher
-        from difflib import SequenceMatcher
-        def color_diff(update_type: str, old: str, new: str) -> tuple[str, str]:
-            matcher = SequenceMatcher(None, old, new)
-            old_colored = ''
-            new_colored = ''
-            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-                old_part = old[i1:i2]
-                new_part = new[j1:j2]
-                if tag == 'equal' or old_part == new_part:
-                    old_colored += old_part
-                    new_colored += new_part
-                elif tag == 'delete':
-                    old_colored += f'<span class="{UPDATE_TYPE_CLASSES[update_type]}">{old_part}</span>'
-                elif tag == 'insert':
-                    new_colored += f'<span class="{UPDATE_TYPE_CLASSES[update_type]}">{new_part}</span>'
-                else:
-                    old_colored += f'<span class="{UPDATE_TYPE_CLASSES[update_type]}">{old_part}</span>'
-                    new_colored += f'<span class="{UPDATE_TYPE_CLASSES[update_type]}">{new_part}</span>'
-            return old_colored, new_colored
-
         old_repo_html, new_repo_html = color_diff("repo", old_repo, new_repo)
         old_user_html, new_user_html = color_diff("user", old_user, new_user)
         old_image_html, new_image_html = color_diff("image", old_image, new_image)
@@ -549,14 +684,16 @@ def image_diff_to_html(old_image_json: dict, new_image_json: dict, only_exact: b
         # old_sha_html, new_sha_html = color_diff("sha", old_sha, new_sha)
         # old_sha_html, new_sha_html = color_diff("none", old_sha, new_sha)
         if old_sha == new_sha:
-            old_sha_html = old_sha
-            new_sha_html = new_sha
+            old_sha_html = escape_html(old_sha)
+            new_sha_html = escape_html(new_sha)
         else:
-            old_sha_html = f'<span class="{UPDATE_TYPE_CLASSES["sha"]}">{old_sha}</span>'
-            new_sha_html = f'<span class="{UPDATE_TYPE_CLASSES["sha"]}">{new_sha}</span>'
+            old_sha_html = f'<span class="{UPDATE_TYPE_CLASSES["sha"]}">{escape_html(old_sha)}</span>'
+            new_sha_html = f'<span class="{UPDATE_TYPE_CLASSES["sha"]}">{escape_html(new_sha)}</span>'
         old_image_html = f'{old_repo_html}<span class="ut-separator">/</span>{old_user_html}<span class="ut-separator">/</span>{old_image_html}<span class="ut-separator">:</span>{old_tag_html}<span class="ut-separator">@</span>{old_sha_html}'
         new_image_html = f'{new_repo_html}<span class="ut-separator">/</span>{new_user_html}<span class="ut-separator">/</span>{new_image_html}<span class="ut-separator">:</span>{new_tag_html}<span class="ut-separator">@</span>{new_sha_html}'
     else:
+        old_repo, old_user, old_image, old_tag, old_sha = map(escape_html, (old_repo, old_user, old_image, old_tag, old_sha))
+        new_repo, new_user, new_image, new_tag, new_sha = map(escape_html, (new_repo, new_user, new_image, new_tag, new_sha))
         # Diffs
         is_repo_updated = old_repo != new_repo
         is_user_updated = old_user != new_user
@@ -591,7 +728,7 @@ def main():
     parser.add_argument(
         '-o', '--output',
         default='commits.html',
-        help='Path to output HTML file (default: commits.html)',
+        help='Path to output HTML file (default: commits.html). A path ending in ".gz" is written gzip-compressed.',
         metavar='OUTPUT',
     )
     parser.add_argument(
@@ -601,27 +738,43 @@ def main():
         metavar='REPO',
     )
 
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes for rendering containers (default: 1)',
+        metavar='JOBS',
+    )
+    parser.add_argument(
+        '--no-section-view',
+        dest='section_view',
+        action='store_false',
+        help='Only render the chronological view, which roughly halves generation time and output size',
+    )
+
     args = parser.parse_args()
 
     # Read JSON input
     try:
         if args.input_json == '-':
-            data = json.load(sys.stdin)
+            data = json_loads(sys.stdin.buffer.read())
         else:
-            with open(args.input_json, 'r') as f:
-                data = json.load(f)
+            with open(args.input_json, 'rb') as f:
+                data = json_loads(f.read())
     except FileNotFoundError:
         print(f"Error: Input file '{args.input_json}' not found", file=sys.stderr)
         sys.exit(1)
-    except json.JSONDecodeError as e:
+    except json.JSONDecodeError as e:  # also raised by orjson
         print(f"Error: Invalid JSON in '{args.input_json}': {e}", file=sys.stderr)
         sys.exit(1)
 
-    html_content = generate_html(data, args.repo)
-
     try:
-        with open(args.output, 'w') as f:
-            f.write(html_content)
+        if args.output.endswith('.gz'):
+            f = gzip.open(args.output, 'wt', encoding='utf-8', compresslevel=6)
+        else:
+            f = open(args.output, 'w', encoding='utf-8', buffering=1 << 20)
+        with f:
+            write_html(data, args.repo, f, args.jobs, args.section_view)
         print(f"HTML output written to {args.output}")
     except IOError as e:
         print(f"Error: Could not write to '{args.output}': {e}", file=sys.stderr)
@@ -206,7 +206,7 @@ def extract_images_from_compose(yaml_content: str, project: str, verbose: bool =
     images: Dict[str, str] = {}
 
     try:
-        compose = yaml.safe_load(yaml_content)
+        compose = yaml.load(yaml_content, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
     except yaml.YAMLError as e:
         logging.getLogger(__name__).debug(f"YAML parsing error: {e}")
         return images
@@ -0,0 +1,38 @@
+import unittest
+from pathlib import Path
+import sys
+
+import yaml
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate_apprise_configuration_pushover import app_to_yaml_entries, render_yaml
+
+
+class RenderYamlRoundTripTests(unittest.TestCase):
+    def assertRoundTrips(self, entries: list[tuple[str, str]]) -> None:
+        loaded = yaml.safe_load(render_yaml(entries))
+        self.assertEqual(loaded, {"version": 1, "urls": [{url: [{"tag": tag}]} for url, tag in entries]})
+
+    def test_app_entries_round_trip(self) -> None:
+        app = {"name": "Docker", "tags": ["docker", "updates"], "defaultPriority": -1}
+        self.assertRoundTrips(app_to_yaml_entries(app))
+
+    def test_yaml_keywords_and_numbers_round_trip(self) -> None:
+        values = ["yes", "No", "null", "~", "true", "3.5", "-1", "0x1F", "1e3", "+.inf", ".NaN", "<<", "="]
+        self.assertRoundTrips([(value, value) for value in values])
+
+    def test_indicators_and_whitespace_round_trip(self) -> None:
+        values = ["", " lead", "trail ", "k: v", "x #c", "#c", "- a", "@x", "`x", "a, b", "'q'", '"q"', "back\\slash",
+                  "tab\there", "line\nbreak"]
+        self.assertRoundTrips([(value, value) for value in values])
+
+    def test_non_printable_and_non_bmp_round_trip(self) -> None:
+        values = ["emoji \U0001F600 and tab\t", "nbsp\xa0\U0001F600", "nel\x85\U0010FFFF", "bom\ufeff",
+                  "\ufffe", "\uffff", "sep\u2028\u2029", "lone \ud83d surrogate"]
+        self.assertRoundTrips([(value, value) for value in values])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -45,7 +45,9 @@ import subprocess
 import sys
 import time
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from shutil import which as _shutil_which
 from typing import Dict, Iterable, List, Optional, Tuple
 
 # =============================================================================
@@ -63,6 +65,8 @@ READ_ONLY_ZFS_SUB_COMMANDS = {
     ("zfs", "holds"),
 }
 
+ZFS_GET_BATCH_SIZE = 256  # datasets/snapshots per "zfs get" call, keeps argv far below ARG_MAX
+
 REQUIRED_PROGRAMS = [
     "zfs",  # ZFS command-line tool
     "proxmox-backup-client",  # Proxmox Backup Server client
@@ -107,10 +111,10 @@ def infer_read_only(cmd: List[str]) -> bool:
     return False
 
 
+@lru_cache(maxsize=64)
 def which(program: str) -> Optional[str]:
-    """Return an absolute path to prog if found in PATH, else None."""
-    from shutil import which as _which
-    return _which(program)
+    """Return an absolute path to prog if found in PATH, else None (cached; PATH does not change during a run)."""
+    return _shutil_which(program)
 
 
 def can_execute(program: str) -> bool:
@@ -172,6 +176,16 @@ def safe_string_to_path(safe_string: str) -> str:
 # Command runner with timing & dry-run semantics
 # =============================================================================
 
+def merged_env(env: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """
+    Return os.environ overlaid with env for a child process, or None to simply inherit
+    os.environ when there is nothing to add. Not cached, as env may carry PBS secrets.
+    """
+    if not env:
+        return None
+    return {**os.environ, **env}
+
+
 def run_cmd(
         cmd: List[str],
         *,
@@ -180,7 +194,7 @@ def run_cmd(
         read_only: Optional[bool] = None,
         env: Optional[Dict[str, str]] = None,
         check: bool = True,
-        capture_output: bool = True,
+        capture_output: bool = False,
         message_for_return_codes: dict[int, str] = None,
         debug_log: bool = False,
 ) -> subprocess.CompletedProcess:
@@ -193,6 +207,8 @@ def run_cmd(
     - In dry-run mode, **read-only commands still execute** (for discovery); mutating
       commands return a fake success result without execution.
     - Always debug-log the elapsed time.
+    - stdout is only captured with `capture_output`, otherwise it is discarded;
+      stderr is always captured so it is available when the command fails.
 
     Returns a subprocess.CompletedProcess (or a synthetic one in dry-run for mutating).
     """
@@ -222,9 +238,10 @@ def run_cmd(
             check = False
         completed_process: subprocess.CompletedProcess = subprocess.run(
             cmd,
-            env={**os.environ, **(env or {})},
+            env=merged_env(env),
             check=check,
-            capture_output=capture_output,
+            stdout=subprocess.PIPE if capture_output else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
         )
         # Check return code if message_for_return_codes is provided
         if message_for_return_codes is not None:
@@ -266,6 +283,16 @@ def check_command_success(cmd: List[str], completed_process: subprocess.Complete
 # ZFS wrappers (the only place that runs zfs commands)
 # =============================================================================
 
+def zfs_output_lines(completed_process: subprocess.CompletedProcess) -> List[str]:
+    """
+    Return the non-empty lines of parsable (-H) zfs output.
+    The output is decoded once as a whole; bytes that are not valid UTF-8 (e.g. in
+    mountpoints) are kept as surrogates like os.fsdecode does, instead of failing.
+    """
+    output = completed_process.stdout.decode(errors="surrogateescape")
+    return [line for line in output.splitlines() if line.strip()]
+
+
 def zfs_list(
         *,
         dataset: Optional[str] = None,
@@ -293,10 +320,10 @@ def zfs_list(
     if dataset:
         cmd.append(dataset)
     completed_process: subprocess.CompletedProcess = run_cmd(cmd, message=None, dry_run=False, read_only=True,
+                                                             capture_output=True,
                                                              message_for_return_codes={
                                                                  1: f"Dataset {quote(dataset)} does not exist or is not a ZFS {"/".join(types)}."})
-    output = completed_process.stdout.decode().splitlines()
-    return [line.split("\t") for line in output if line.strip()]
+    return [line.split("\t") for line in zfs_output_lines(completed_process)]
 
 
 def zfs_dataset_exists(
@@ -319,7 +346,8 @@ def zfs_dataset_exists(
         cmd += ["-t", ",".join(types)]
     cmd.append(dataset)
     try:
-        completed_process: subprocess.CompletedProcess = run_cmd(cmd, dry_run=False, read_only=True, check=False)
+        completed_process: subprocess.CompletedProcess = run_cmd(cmd, dry_run=False, read_only=True, check=False,
+                                                                 capture_output=True)
         return bool(completed_process.stdout.strip())
     except subprocess.CalledProcessError:
         return False
@@ -364,6 +392,7 @@ def zfs_get(
 ) -> Dict[str, Dict[str, str]]:
     """
     Get ZFS properties for datasets with parsable output.
+    Datasets are queried in batches of ZFS_GET_BATCH_SIZE per command.
     """
     if source_order is None:
         source_order = ["local", "received", "default", "inherited"]
@@ -373,28 +402,30 @@ def zfs_get(
         return {}
     # Make datasets unique
     datasets: List[str] = list(set(datasets))
-    # Build the command
-    cmd: List[str] = [
-        "zfs", "get", "-H", "-p",
-        "-o", "name,property,value,source",
-        "-s", ",".join(source_order),
-        ",".join(properties),
-    ]
-    cmd += datasets
-    # Run the command
-    completed_process: subprocess.CompletedProcess = run_cmd(cmd, dry_run=False, read_only=True, check=False)
-    # If the command failed, it's either because the datasets do not exist or we don't have enough permissions.
-    if completed_process.returncode != 0:
-        check_zfs_datasets_exist(datasets, completed_process, cmd=cmd)
 
     properties_by_dataset: Dict[str, Dict[str, str]] = {}
-    for line in completed_process.stdout.decode().splitlines():
-        if not line.strip():
-            continue
-        dataset, key, value, source = line.split("\t", 3)
-        if dataset not in properties_by_dataset:
-            properties_by_dataset[dataset] = {}
-        properties_by_dataset[dataset][key] = value
+    for start in range(0, len(datasets), ZFS_GET_BATCH_SIZE):
+        batch: List[str] = datasets[start:start + ZFS_GET_BATCH_SIZE]
+        # Build the command
+        cmd: List[str] = [
+            "zfs", "get", "-H", "-p",
+            "-o", "name,property,value,source",
+            "-s", ",".join(source_order),
+            ",".join(properties),
+        ]
+        cmd += batch
+        # Run the command
+        completed_process: subprocess.CompletedProcess = run_cmd(cmd, dry_run=False, read_only=True, check=False,
+                                                                 capture_output=True)
+        # If the command failed, it's either because the datasets do not exist or we don't have enough permissions.
+        if completed_process.returncode != 0:
+            check_zfs_datasets_exist(batch, completed_process, cmd=cmd)
+
+        for line in zfs_output_lines(completed_process):
+            dataset, key, value, source = line.split("\t", 3)
+            if dataset not in properties_by_dataset:
+                properties_by_dataset[dataset] = {}
+            properties_by_dataset[dataset][key] = value
     return properties_by_dataset
 
 
@@ -463,6 +494,9 @@ def zfs_create_snapshots(datasets: List[str], snapshot_name: str, *, recursive:
     if completed_process.returncode != 0:
         check_zfs_datasets_exist(datasets, completed_process, cmd=cmd, types=["filesystem"])
 
+    # Cached snapshot listings are outdated now
+    list_snapshots_for_dataset.cache_clear()
+
     # Return the created snapshots
     return snapshots
 
@@ -520,16 +554,15 @@ def zfs_holds(snapshots: List[str], *, recursive: bool, dry_run: bool) -> Dict[s
     cmd += snapshots
 
     # Run the command
-    completed_process: subprocess.CompletedProcess = run_cmd(cmd, dry_run=False, read_only=True, check=False)
+    completed_process: subprocess.CompletedProcess = run_cmd(cmd, dry_run=False, read_only=True, check=False,
+                                                             capture_output=True)
     # If the command failed, it's either because the datasets do not exist or we don't have enough permissions.
     if completed_process.returncode != 0:
         check_zfs_datasets_exist(snapshots, completed_process, cmd=cmd, types=["snapshot"])
 
     # Parse the output
     holds_by_snapshot: Dict[str, List[str]] = {snapshot: [] for snapshot in snapshots}
-    for line in completed_process.stdout.decode().splitlines():
-        if not line.strip():
-            continue
+    for line in zfs_output_lines(completed_process):
         # <snapshot>\t<tag>\t<timestamp>
         snapshot, tag, timestamp = line.split("\t", 2)
         # if snapshot not in holds_by_snapshot:
@@ -609,6 +642,9 @@ def zfs_destroy_snapshots(snapshots: List[str], *, recursive: bool, dry_run: boo
         if completed_process.returncode != 0:
             check_zfs_datasets_exist([snapshot], completed_process, cmd=cmd, types=["snapshot"])
 
+    # Cached snapshot listings are outdated now
+    list_snapshots_for_dataset.cache_clear()
+
 
 # =============================================================================
 # ZFS helpers
@@ -628,10 +664,12 @@ def get_mountpoints_recursively(root_dataset: str) -> Dict[str, str]:
     return {name: mountpoint for name, mountpoint in rows}
 
 
-def list_snapshots_for_dataset(dataset: str, prefix: str) -> List[str]:
+@lru_cache(maxsize=1024)
+def list_snapshots_for_dataset(dataset: str, prefix: str) -> Tuple[str, ...]:
     """
     Return full snapshot names for this dataset that start with the given prefix.
     e.g. "pool/data@zfs-pbs-backup_1699999999"
+    The result is cached until snapshots are created or destroyed.
     """
     rows = zfs_list(
         dataset=dataset,
@@ -641,7 +679,7 @@ def list_snapshots_for_dataset(dataset: str, prefix: str) -> List[str]:
     )
     snapshots = [row[0] for row in rows if row]
     full_prefix = f"{dataset}@{prefix}"
-    return [snapshot for snapshot in snapshots if snapshot.startswith(full_prefix)]
+    return tuple(snapshot for snapshot in snapshots if snapshot.startswith(full_prefix))
 
 
 def snapshot_path_on_disk(dataset_mountpoint: str, snapshot_name: str) -> Path:
@@ -826,11 +864,12 @@ def collect_datasets_to_backup(
 
     for root_dataset in root_datasets:
         mountpoint_by_dataset = get_mountpoints_recursively(root_dataset)
+        # Read the include property of all datasets with a single zfs get
+        properties_by_dataset = zfs_get(list(mountpoint_by_dataset.keys()), [property_include])
         # dataset -> include mode
         include_modes: Dict[str, str] = {}
         for dataset in mountpoint_by_dataset.keys():
-            include_mode = zfs_get([dataset], [property_include]).get(dataset, {}).get(property_include,
-                                                                                       "").strip().lower()
+            include_mode = properties_by_dataset.get(dataset, {}).get(property_include, "").strip().lower()
             if include_mode == "":
                 include_mode = "false"
             if include_mode not in {"true", "false", "recursive", "children"}:
@@ -888,9 +927,12 @@ def find_resume_timestamp(
     timestamp_newest: Optional[str] = None
     for dataset_plan in dataset_plans:
         snapshots = list_snapshots_for_dataset(dataset_plan.dataset, snapshot_prefix)
+        if not snapshots:
+            continue
+        properties_by_snapshot = zfs_get(snapshots, [property_snapshot_timestamp])
         for snapshot in snapshots:
             snapshot_name = snapshot.split("@", 1)[1]
-            properties = zfs_get([snapshot], [property_snapshot_timestamp]).get(snapshot, {})
+            properties = properties_by_snapshot.get(snapshot, {})
             timestamp = properties.get(property_snapshot_timestamp, "").strip()
             if timestamp.isdigit():
                 if timestamp_newest is None or int(timestamp) > int(timestamp_newest):
@@ -916,10 +958,13 @@ def find_orphan_snapshots(
     """
     orphan_datasets_by_snapshot_name: Dict[str, List[str]] = {}
     for dataset_plan in dataset_plans:
-        snapshots: List[str] = list_snapshots_for_dataset(dataset_plan.dataset, snapshot_prefix)
+        snapshots: Tuple[str, ...] = list_snapshots_for_dataset(dataset_plan.dataset, snapshot_prefix)
+        if not snapshots:
+            continue
+        properties_by_snapshot = zfs_get(snapshots, [property_snapshot_timestamp])
         for snapshot in snapshots:
             dataset, snapshot_name = snapshot.split("@", 1)
-            properties = zfs_get([snapshot], [property_snapshot_timestamp]).get(snapshot, {})
+            properties = properties_by_snapshot.get(snapshot, {})
             timestamp = properties.get(property_snapshot_timestamp, "").strip()
             if not timestamp.isdigit():
                 if snapshot_name.startswith(snapshot_prefix):
@@ -994,7 +1039,8 @@ def pbs_status(
         read_only=True,
         env=env,
         debug_log=True,
-        check=False
+        check=False,
+        capture_output=True,
     )
     logging.debug("PBS repository status: %s",
                   completed_process.stdout.decode().strip() if completed_process.stdout else " No output")
@@ -1153,7 +1199,8 @@ def pbs_backup_dataset_snapshot(
             dry_run=dry_run,
             read_only=False,
             env=env,
-            check=False
+            check=False,
+            capture_output=True,
         )
         # Log the output
         log_pbs_backup_output(completed_process)